@@ -10,7 +10,9 @@ app = typer.Typer()
 def build(appabuild_config_path: Annotated[Optional[str], typer.Argument(
     help="AppaBuild environment configuration file, required unless --no-init is specified")],
           lca_config_path: Annotated[str, typer.Argument(help="LCA configuration file")],
-          init: Annotated[bool, typer.Option(help="initialize AppaBuild environment")] = True):
+          init: Annotated[bool, typer.Option(help="initialize AppaBuild environment")] = True,
+          cache: Annotated[bool, typer.Option(
+              help="reuse the impact model of a previous build if its inputs are unchanged")] = False):
     """
     Build an impact model and save it to the disk.
     An AppaBuild environment is initialized (background and foreground databases), unless --no-init is specified.
@@ -23,4 +25,4 @@ def build(appabuild_config_path: Annotated[Optional[str], typer.Argument(
             return
         foreground_database = setup.initialize(appabuild_config_path)
 
-    setup.build(lca_config_path, foreground_database)
+    setup.build(lca_config_path, foreground_database, use_cache=cache)
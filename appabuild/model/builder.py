@@ -4,22 +4,26 @@ Majority of the code is copied and adapted from lca_algebraic package.
 """
 from __future__ import annotations
 
-import itertools
+import functools
 import os
 import types
 from collections import OrderedDict
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 
 import brightway2 as bw
 import lca_algebraic as lcaa
-import yaml
 from apparun.impact_methods import MethodFullName
 from apparun.impact_model import ImpactModel, ModelMetadata
 from apparun.impact_tree import ImpactTreeNode
-from apparun.parameters import EnumParam, FloatParam, ImpactModelParams
+from apparun.parameters import (
+    EnumParam,
+    FloatParam,
+    ImpactModelParam,
+    ImpactModelParams,
+)
 from apparun.tree_node import NodeProperties
 from bw2data.backends.peewee import Activity
-from lca_algebraic import ActivityExtended, with_db_context
+from lca_algebraic import ActivityExtended
 from lca_algebraic.base_utils import _getAmountOrFormula, _getDb, debug
 from lca_algebraic.helpers import _isForeground
 from lca_algebraic.lca import (
@@ -27,18 +31,24 @@ from lca_algebraic.lca import (
     _multiLCAWithCache,
     _replace_fixed_params,
 )
-from lca_algebraic.params import _fixed_params, newEnumParam, newFloatParam
-from sympy import Expr, simplify, symbols
+from lca_algebraic.params import (
+    DbContext,
+    _fixed_params,
+    newEnumParam,
+    newFloatParam,
+)
+from sympy import Expr, Symbol, simplify, symbols
 
 from appabuild.database.databases import ForegroundDatabase, parameters_registry
 from appabuild.exceptions import BwDatabaseError, BwMethodError
-
-act_symbols = {}  # Cache of  act = > symbol
+from appabuild.utils import load_yaml
 
 
+@functools.lru_cache(maxsize=None)
 def to_bw_method(method_full_name: MethodFullName) -> Tuple[str, str, str]:
     """
-    Find corresponding method as known by Brightway.
+    Find corresponding method as known by Brightway. Results are cached to avoid
+    scanning all Brightway methods at each call.
     :param method_full_name: method to be found.
     :return: Brightway representation of the method.
     """
@@ -54,6 +64,49 @@ def to_bw_method(method_full_name: MethodFullName) -> Tuple[str, str, str]:
     return matching_methods[0]
 
 
+def _index_parameters_by_symbol(
+    known_parameters: ImpactModelParams,
+) -> Dict[str, List[ImpactModelParam]]:
+    """
+    Index parameters by the symbol names they correspond to. This mirrors
+    ImpactModelParam.corresponds rules of each parameter type.
+    :param known_parameters: parameters to index.
+    :return: matching parameters, by symbol name.
+    """
+    parameters_by_symbol = {}
+    for parameter in known_parameters.parameters:
+        if isinstance(parameter, EnumParam):
+            symbol_names = parameter.dummies_names
+        elif isinstance(parameter, FloatParam):
+            symbol_names = [parameter.name]
+        else:
+            symbol_names = []
+        for symbol_name in symbol_names:
+            parameters_by_symbol.setdefault(symbol_name, []).append(parameter)
+    return parameters_by_symbol
+
+
+def _find_corresponding_parameter(
+    parameters_by_symbol: Dict[str, List[ImpactModelParam]], symbol_name: str
+) -> ImpactModelParam:
+    """
+    Find the single parameter corresponding to a symbol.
+    :param parameters_by_symbol: parameters indexed by symbol name, see
+    _index_parameters_by_symbol.
+    :param symbol_name: name of the symbol.
+    :return: corresponding parameter.
+    """
+    matching_parameters = parameters_by_symbol.get(symbol_name, [])
+    if len(matching_parameters) > 1:
+        raise ValueError(
+            f"{symbol_name} matches with multiple params "
+            f"({[parameter.name for parameter in matching_parameters]})."
+        )
+    if len(matching_parameters) < 1:
+        raise ValueError(f"{symbol_name} doesn't match with any params.")
+    return matching_parameters[0]
+
+
 class ImpactModelBuilder:
     """
     Main purpose of this class is to build Impact Models.
@@ -90,6 +143,8 @@ class ImpactModelBuilder:
         self.output_path = output_path
         self.compile_models = compile_models
         self.bw_user_database = bw.Database(self.user_database_name)
+        self.act_symbols = {}  # Cache of  act = > symbol
+        self._used_symbol_names: set[str] = set()  # Names of symbols in act_symbols
 
     @staticmethod
     def from_yaml(lca_config_path: str) -> ImpactModelBuilder:
@@ -98,9 +153,15 @@ class ImpactModelBuilder:
         :param lca_config_path: path to the file holding the configuration.
         :return: the Impact Model Builder
         """
-        with open(lca_config_path, "r") as stream:
-            lca_config = yaml.safe_load(stream)
+        return ImpactModelBuilder.from_dict(load_yaml(lca_config_path))
 
+    @staticmethod
+    def from_dict(lca_config: dict) -> ImpactModelBuilder:
+        """
+        Initializes a build with information contained in a parsed configuration
+        :param lca_config: content of the LCA configuration file.
+        :return: the Impact Model Builder
+        """
         builder = ImpactModelBuilder(
             lca_config["scope"]["fu"]["database"],
             lca_config["scope"]["fu"]["name"],
@@ -129,6 +190,8 @@ class ImpactModelBuilder:
                 self.functional_unit, self.parameters
             )
             foreground_database.execute_at_build_time()
+            # User database has been rewritten, activities have to be indexed again
+            self.__dict__.pop("_activities_by_name", None)
 
         functional_unit_bw = self.find_functional_unit_in_bw()
         tree, params = self.build_impact_tree_and_parameters(
@@ -137,14 +200,22 @@ class ImpactModelBuilder:
         impact_model = ImpactModel(tree=tree, parameters=params, metadata=self.metadata)
         return impact_model
 
+    @functools.cached_property
+    def _activities_by_name(self) -> dict[str, List[ActivityExtended]]:
+        """
+        Index of user database activities by name, built on first access.
+        """
+        activities_by_name = {}
+        for activity in self.bw_user_database:
+            activities_by_name.setdefault(activity["name"], []).append(activity)
+        return activities_by_name
+
     def find_functional_unit_in_bw(self) -> ActivityExtended:
         """
         Find the bw activity matching the functional unit in the bw database. A single activity
         should be found as it is to be used as the root of the tree.
         """
-        functional_unit_bw = [
-            i for i in self.bw_user_database if self.functional_unit == i["name"]
-        ]
+        functional_unit_bw = self._activities_by_name.get(self.functional_unit, [])
         if len(functional_unit_bw) < 1:
             raise BwDatabaseError(
                 f"Cannot find activity {self.functional_unit} for FU."
@@ -167,7 +238,10 @@ class ImpactModelBuilder:
         method format is Appa Run method keys.
         :return: root node (corresponding to the reference flow) and used parameters.
         """
-        methods_bw = [to_bw_method(MethodFullName[method]) for method in methods]
+        bw_methods_by_name = {
+            method: to_bw_method(MethodFullName[method]) for method in methods
+        }
+        methods_bw = list(bw_methods_by_name.values())
         tree = ImpactTreeNode(
             name=functional_unit_bw["name"],
             amount=1,
@@ -176,45 +250,30 @@ class ImpactModelBuilder:
         # print("computing model to expression for %s" % model)
         self.actToExpression(functional_unit_bw, tree)
 
+        descendants = list(tree.unnested_descendants)
+
         # Find required parameters by inspecting symbols
-        free_symbols = set(
-            list(
-                itertools.chain.from_iterable(
-                    [
-                        [str(symb) for symb in node._raw_direct_impact.free_symbols]
-                        for node in tree.unnested_descendants
-                    ]
-                )
-            )
-            + list(
-                itertools.chain.from_iterable(
-                    [
-                        [str(symb) for symb in node.amount.free_symbols]
-                        for node in tree.unnested_descendants
-                        if isinstance(node.amount, Expr)
-                    ]
-                )
-            )
+        free_symbols = set()
+        for node in descendants:
+            for expr in (node._raw_direct_impact, node.amount):
+                # Constant expressions have no symbol to walk through
+                if isinstance(expr, Expr) and not expr.is_number:
+                    free_symbols.update(map(str, expr.atoms(Symbol)))
+        activity_symbols = set(
+            [str(symb["symbol"]) for _, symb in self.act_symbols.items()]
         )
-        activity_symbols = set([str(symb["symbol"]) for _, symb in act_symbols.items()])
 
         expected_parameter_symbols = free_symbols - activity_symbols
 
         known_parameters = ImpactModelParams.from_list(parameters_registry.values())
 
-        forbidden_parameter_names = list(
-            itertools.chain(
-                *[
-                    [
-                        elem.name
-                        for elem in known_parameters.find_corresponding_parameter(
-                            activity_symbol, must_find_one=False
-                        )
-                    ]
-                    for activity_symbol in activity_symbols
-                ]
-            )
-        )
+        parameters_by_symbol = _index_parameters_by_symbol(known_parameters)
+
+        forbidden_parameter_names = [
+            parameter.name
+            for activity_symbol in activity_symbols
+            for parameter in parameters_by_symbol.get(activity_symbol, [])
+        ]
 
         if len(forbidden_parameter_names) > 0:
             raise ValueError(
@@ -223,15 +282,18 @@ class ImpactModelBuilder:
             )
 
         used_parameters = [
-            known_parameters.find_corresponding_parameter(expected_parameter_symbol)
+            _find_corresponding_parameter(
+                parameters_by_symbol, expected_parameter_symbol
+            )
             for expected_parameter_symbol in expected_parameter_symbols
         ]
+        # Several symbols can map to the same parameter (e.g. enum parameters)
+        seen_parameter_names = set()
         unique_used_parameters = []
-        [
-            unique_used_parameters.append(i)
-            for i in used_parameters
-            if i not in unique_used_parameters
-        ]
+        for parameter in used_parameters:
+            if parameter.name not in seen_parameter_names:
+                seen_parameter_names.add(parameter.name)
+                unique_used_parameters.append(parameter)
         unique_used_parameters = ImpactModelParams.from_list(unique_used_parameters)
         # Declare used parameters in conf file as a lca_algebraic parameter to enable
         # model building (will not be used afterwards)
@@ -251,7 +313,7 @@ class ImpactModelBuilder:
         # We create a technosphere activity mapping exactly to 1 biosphere item
         pureTechActBySymbol = OrderedDict()
         for act, name in [
-            (act, name) for act, name in act_symbols.items() if name["to_compile"]
+            (act, name) for act, name in self.act_symbols.items() if name["to_compile"]
         ]:
             pureTechActBySymbol[name["symbol"]] = _createTechProxyForBio(
                 act, functional_unit_bw.key[0]
@@ -260,56 +322,65 @@ class ImpactModelBuilder:
         # Compute LCA for background activities
         lcas = _multiLCAWithCache(pureTechActBySymbol.values(), methods_bw)
 
+        # Substitutions of activities by their value only depend on the method
+        subs_by_method = {
+            method: {
+                symbol: lcas[(act, bw_methods_by_name[method])]
+                for symbol, act in pureTechActBySymbol.items()
+            }
+            for method in methods
+        }
+
         # For each method, compute an algebric expression with activities replaced by their values
-        for node in tree.unnested_descendants:
+        for node in descendants:
             model_expr = node._raw_direct_impact
             for method in methods:
-                # Replace activities by their value in expression for this method
-                sub = dict(
-                    {
-                        symbol: lcas[(act, to_bw_method(MethodFullName[method]))]
-                        for symbol, act in pureTechActBySymbol.items()
-                    }
+                node.direct_impacts[method] = model_expr.xreplace(
+                    subs_by_method[method]
                 )
-                node.direct_impacts[method] = model_expr.xreplace(sub)
         return tree, unique_used_parameters
 
-    @staticmethod
-    @with_db_context
-    def actToExpression(act: Activity, impact_model_tree_node: ImpactTreeNode):
+    def _act_to_symbol(self, sub_act: Activity, to_compile: bool = True):
+        """
+        Transform an activity to a named symbol and keep cache of it.
+        :param sub_act: Brightway activity to be referenced as a symbol.
+        :param to_compile: if True, activity's LCA will be computed to replace symbol.
+        :return: symbol of the activity.
+        """
+        # Look in cache
+        act_symbol = self.act_symbols.get(sub_act.key)
+        if act_symbol is not None:
+            return act_symbol["symbol"]
+
+        base_slug = ImpactTreeNode.node_name_to_symbol_name(sub_act["name"])
+
+        slug = base_slug
+        i = 1
+        while slug in self._used_symbol_names:
+            slug = f"{base_slug}{i}"
+            i += 1
+        self._used_symbol_names.add(slug)
+
+        act_symbol = {"symbol": symbols(slug), "to_compile": to_compile}
+        self.act_symbols[sub_act.key] = act_symbol
+        return act_symbol["symbol"]
+
+    def actToExpression(self, act: Activity, impact_model_tree_node: ImpactTreeNode):
         """
         Determines the arithmetic model corresponding to activity's impact function of
         model's parameters.
+        Nodes of activities included in tree are created along the way, and their own
+        model is determined afterward, from an explicit stack rather than recursively.
         :param act: Brightway activity corresponding to the node.
         :param impact_model_tree_node: node of the tree to store result in.
         :return:
         """
 
-        def act_to_symbol(sub_act, to_compile: bool = True):
-            """Transform an activity to a named symbol and keep cache of it"""
-
-            db_name, code = sub_act.key
-
-            # Look in cache
-            if not (db_name, code) in act_symbols:
-                act = _getDb(db_name).get(code)
-                name = act["name"]
-                base_slug = ImpactTreeNode.node_name_to_symbol_name(name)
-
-                slug = base_slug
-                i = 1
-                while symbols(slug) in [
-                    act_symbol["symbol"] for act_symbol in list(act_symbols.values())
-                ]:
-                    slug = f"{base_slug}{i}"
-                    i += 1
-
-                act_symbols[(db_name, code)] = {
-                    "symbol": symbols(slug),
-                    "to_compile": to_compile,
-                }
-
-            return act_symbols[(db_name, code)]["symbol"]
+        # Activities included in tree, with their node, whose model is to be determined
+        _pending_nodes: List[Tuple[Activity, ImpactTreeNode]] = []
+        # Expressions of foreground activities not creating tree nodes, by activity key,
+        # for the node being handled
+        _subtree_cache: dict[tuple, Expr] = {}
 
         def rec_func(act: Activity, impact_model_tree_node: ImpactTreeNode):
             res = 0
@@ -318,7 +389,7 @@ class ImpactModelBuilder:
             if not _isForeground(act["database"]):
                 # We reached a background DB ? => stop developping and create reference
                 # to activity
-                return act_to_symbol(act)
+                return self._act_to_symbol(act)
 
             for exch in act.exchanges():
                 amount = _getAmountOrFormula(exch)
@@ -336,27 +407,29 @@ class ImpactModelBuilder:
                 # Background DB or tracked foreground activity => reference it as a
                 # symbol
                 if not _isForeground(input_db):
-                    act_expr = act_to_symbol(sub_act)
+                    act_expr = self._act_to_symbol(sub_act)
                 else:
                     if impact_model_tree_node.name_already_in_tree(sub_act["name"]):
                         raise Exception(f"Found recursive activity: {sub_act['name']}")
                     if sub_act.get("include_in_tree"):
-                        # act_expr = act_to_symbol(sub_act, to_compile=False)
-                        ImpactModelBuilder.actToExpression(
-                            sub_act,
-                            impact_model_tree_node.new_child(
-                                name=sub_act["name"],
-                                amount=amount,
-                                properties=NodeProperties.from_dict(
-                                    sub_act["properties"]
+                        # act_expr = self._act_to_symbol(sub_act, to_compile=False)
+                        _pending_nodes.append(
+                            (
+                                sub_act,
+                                impact_model_tree_node.new_child(
+                                    name=sub_act["name"],
+                                    amount=amount,
+                                    properties=NodeProperties.from_dict(
+                                        sub_act["properties"]
+                                    ),
                                 ),
-                            ),
+                            )
                         )
                         amount = 1  # amount is already handled in tree node
                         act_expr = 0  # no direct impact
                     # Our model : recursively it to a symbolic expression
                     else:
-                        act_expr = rec_func(sub_act, impact_model_tree_node)
+                        act_expr = cached_rec_func(sub_act, impact_model_tree_node)
 
                 avoidedBurden = 1
 
@@ -372,11 +445,34 @@ class ImpactModelBuilder:
 
             return res / outputAmount
 
-        expr = rec_func(act, impact_model_tree_node)
-
-        if isinstance(expr, float):
-            expr = simplify(expr)
-        else:
-            # Replace fixed params with their default value
-            expr = _replace_fixed_params(expr, _fixed_params().values())
-        impact_model_tree_node._raw_direct_impact = expr
+        def cached_rec_func(act: Activity, impact_model_tree_node: ImpactTreeNode):
+            """Call rec_func, reusing expressions of activities already developed"""
+            act_expr = _subtree_cache.get(act.key)
+            if act_expr is None:
+                nb_children = len(impact_model_tree_node.children)
+                act_expr = rec_func(act, impact_model_tree_node)
+                # Sub-trees including nodes cannot be reused, as nodes would not be
+                # created again
+                if len(impact_model_tree_node.children) == nb_children:
+                    _subtree_cache[act.key] = act_expr
+            return act_expr
+
+        def node_to_expression(act: Activity, impact_model_tree_node: ImpactTreeNode):
+            _subtree_cache.clear()  # Cached expressions are only valid for a node
+            expr = rec_func(act, impact_model_tree_node)
+
+            if isinstance(expr, float):
+                expr = simplify(expr)
+            else:
+                # Replace fixed params with their default value
+                expr = _replace_fixed_params(expr, _fixed_params().values())
+            impact_model_tree_node._raw_direct_impact = expr
+
+        stack = [(act, impact_model_tree_node)]
+        while len(stack) > 0:
+            node_act, node = stack.pop()
+            with DbContext(node_act):
+                node_to_expression(node_act, node)
+            # Reversed, so that children are handled in the order they were found
+            stack.extend(reversed(_pending_nodes))
+            _pending_nodes.clear()
@@ -1,10 +1,14 @@
 """
 Setup everything required to build an ImpactModel
 """
+import hashlib
+import importlib.metadata
+import os
+import pickle
 from typing import Optional
 
 import brightway2 as bw
-import yaml
+from apparun.impact_model import ImpactModel
 
 from appabuild.database.databases import (
     BiosphereDatabase,
@@ -13,6 +17,7 @@ from appabuild.database.databases import (
     ForegroundDatabase,
 )
 from appabuild.model.builder import ImpactModelBuilder
+from appabuild.utils import load_yaml
 
 
 def initialize(appabuild_config_path: str) -> ForegroundDatabase:
@@ -23,8 +28,7 @@ def initialize(appabuild_config_path: str) -> ForegroundDatabase:
     remain the same for all your LCAs.
     :return: the initialized foreground database
     """
-    with open(appabuild_config_path, "r") as stream:
-        appabuild_config = yaml.safe_load(stream)
+    appabuild_config = load_yaml(appabuild_config_path)
 
     return project_setup(
         project_name=appabuild_config["project_name"],
@@ -35,16 +39,32 @@ def initialize(appabuild_config_path: str) -> ForegroundDatabase:
     )
 
 
-def build(lca_config_path: str, foreground_database: Optional[ForegroundDatabase] = None):
+def build(
+    lca_config_path: str,
+    foreground_database: Optional[ForegroundDatabase] = None,
+    use_cache: bool = False,
+):
     """
     Build an impact model for the configured functional unit and save it to the disk (to the location configured in the file).
     :param lca_config_path: information about the current LCA, such as functional unit,
     list of methods.
     :param foreground_database: database containing the LCA functional unit
+    :param use_cache: if True, the impact model is also pickled next to its yaml file,
+    and reused instead of being built again as long as build inputs are unchanged.
     :return the impact model
     """
 
     impact_model_builder = ImpactModelBuilder.from_yaml(lca_config_path)
+    cache_path = f"{impact_model_builder.output_path}.pkl"
+
+    if use_cache and os.path.exists(impact_model_builder.output_path):
+        cached_impact_model = load_cached_impact_model(
+            cache_path,
+            build_inputs_hash(lca_config_path, foreground_database),
+            impact_model_builder.output_path,
+        )
+        if cached_impact_model is not None:
+            return cached_impact_model
 
     impact_model = impact_model_builder.build_impact_model(foreground_database)
 
@@ -53,9 +73,99 @@ def build(lca_config_path: str, foreground_database: Optional[ForegroundDatabase
         impact_model_builder.compile_models
     )
 
+    if use_cache:
+        # Hash is computed after the build, as it can write biosphere proxies to the
+        # user database
+        inputs_hash = build_inputs_hash(lca_config_path, foreground_database)
+        yaml_digest = file_digest(impact_model_builder.output_path)
+        with open(cache_path, "wb") as stream:
+            pickle.dump((inputs_hash, yaml_digest, impact_model), stream, protocol=5)
+
     return impact_model
 
 
+def load_cached_impact_model(
+    cache_path: str, inputs_hash: str, output_path: str
+) -> Optional[ImpactModel]:
+    """
+    Load an impact model pickled by a previous build, if it was built from the same
+    inputs and its yaml file has not been overwritten since.
+    :param cache_path: path of the pickled impact model.
+    :param inputs_hash: hash of current build inputs, see build_inputs_hash.
+    :param output_path: path of the impact model yaml file.
+    :return: the cached impact model, or None if there is no usable one.
+    """
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        with open(cache_path, "rb") as stream:
+            cached_inputs_hash, cached_yaml_digest, cached_impact_model = pickle.load(
+                stream
+            )
+    except Exception:
+        # Truncated or incompatible pickles are built again
+        return None
+    if cached_inputs_hash != inputs_hash:
+        return None
+    if cached_yaml_digest != file_digest(output_path):
+        # Yaml file has been written by another build
+        return None
+    return cached_impact_model
+
+
+def file_digest(path: str) -> str:
+    """
+    Compute a hash of a file content.
+    :param path: path of the file.
+    :return: hexadecimal digest of the file content.
+    """
+    with open(path, "rb") as stream:
+        return hashlib.sha256(stream.read()).hexdigest()
+
+
+def build_inputs_hash(
+    lca_config_path: str, foreground_database: Optional[ForegroundDatabase] = None
+) -> str:
+    """
+    Compute a hash of everything an impact model build depends on: versions of the
+    packages building the model, LCA configuration file content, Brightway project,
+    foreground datasets modification times, Brightway methods, and modification times
+    of databases already in Brightway project.
+    Databases re-imported at each initialization are not hashed by modification time:
+    biosphere flows are set up by Brightway, and impact proxies derive from methods.
+    :param lca_config_path: information about the current LCA.
+    :param foreground_database: database containing the LCA functional unit
+    :return: hexadecimal digest of the inputs.
+    """
+    inputs_hash = hashlib.sha256(bw.projects.current.encode())
+    for package in ["appabuild", "apparun", "lca_algebraic", "sympy"]:
+        try:
+            package_version = importlib.metadata.version(package)
+        except importlib.metadata.PackageNotFoundError:
+            package_version = None
+        inputs_hash.update(f"{package}:{package_version}".encode())
+    with open(lca_config_path, "rb") as stream:
+        inputs_hash.update(stream.read())
+    if foreground_database is not None:
+        for root, dirs, files in sorted(os.walk(foreground_database.path)):
+            for filename in sorted(files):
+                filepath = os.path.join(root, filename)
+                modified = os.stat(filepath).st_mtime_ns
+                inputs_hash.update(f"{filepath}:{modified}".encode())
+    for method in sorted(bw.methods):
+        inputs_hash.update(str(method).encode())
+    skipped_databases = [BiosphereDatabase().name, ImpactProxiesDatabase().name]
+    if foreground_database is not None:
+        # Foreground database is rewritten at each build, datasets are hashed instead
+        skipped_databases.append(foreground_database.name)
+    for database_name in sorted(bw.databases):
+        if database_name in skipped_databases:
+            continue
+        modified = bw.databases[database_name].get("modified")
+        inputs_hash.update(f"{database_name}:{modified}".encode())
+    return inputs_hash.hexdigest()
+
+
 def project_setup(
         project_name: str,
         ecoinvent_name: str,
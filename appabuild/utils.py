@@ -0,0 +1,19 @@
+"""
+Utilities shared by Appa Build modules.
+"""
+import yaml
+
+try:
+    from yaml import CSafeLoader
+except ImportError:
+    from yaml import SafeLoader as CSafeLoader
+
+
+def load_yaml(path: str) -> dict:
+    """
+    Parse a YAML file, using libyaml if available.
+    :param path: path to the YAML file.
+    :return: parsed content of the file.
+    """
+    with open(path, "r") as stream:
+        return yaml.load(stream, Loader=CSafeLoader)
@@ -5,6 +5,8 @@ import brightway2 as bw
 from bw2data.tests import bw2test
 from lca_algebraic import setForeground
 
+from appabuild.database.databases import ImpactProxiesDatabase
+from appabuild.model.builder import ImpactModelBuilder
 from appabuild.setup import build
 
 @bw2test
@@ -34,3 +36,69 @@ def test_build():
     print(f"filename {irregular_names}")
 
     assert (len(same_files) == 1)
+
+
+@bw2test
+def test_build_cache(monkeypatch, tmp_path):
+    """
+    Impact model pickled by a build is reused as long as build inputs are unchanged.
+    """
+    bw.projects.set_current("test_project")
+
+    bw.bw2setup()
+
+    bw.BW2Package.import_file(os.path.join(os.path.realpath(''), 'data/background_database', 'technosphere.bw2package'))
+    bw.BW2Package.import_file(
+        os.path.join(os.path.realpath(''), 'data/user_database', 'user_database_no_proxy.bw2package'))
+    setForeground("user_database")
+
+    cache_path = "data/output/actual/somethingToAnalyse.yaml.pkl"
+    if os.path.exists(cache_path):
+        os.remove(cache_path)
+
+    try:
+        build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert os.path.exists(cache_path)
+
+        built_models = []
+        build_impact_model = ImpactModelBuilder.build_impact_model
+
+        def counting_build_impact_model(self, *args, **kwargs):
+            built_models.append(self.functional_unit)
+            return build_impact_model(self, *args, **kwargs)
+
+        monkeypatch.setattr(ImpactModelBuilder, "build_impact_model", counting_build_impact_model)
+
+        # Unchanged inputs: cached model is reused
+        impact_model = build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert len(built_models) == 0
+        assert impact_model.tree.name == "nvidia_ai_gpu_chip"
+
+        # Databases re-imported at initialization: cached model is reused
+        ImpactProxiesDatabase().execute_at_startup()
+        build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert len(built_models) == 0
+
+        # Changed LCA configuration: model is built again
+        lca_config_path = tmp_path / "nvidia_ai_gpu_chip_test.yaml"
+        with open("data/nvidia_ai_gpu_chip_test.yaml", "r") as stream:
+            lca_config_path.write_text(stream.read() + "\n# modified\n")
+        build(str(lca_config_path), None, use_cache=True)
+        assert len(built_models) == 1
+
+        # Yaml file overwritten by a build without cache: model is built again
+        build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert len(built_models) == 2
+        build(str(lca_config_path), None)
+        assert len(built_models) == 3
+        build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert len(built_models) == 4
+
+        # Unreadable pickle: model is built again
+        with open(cache_path, "wb") as stream:
+            stream.write(b"truncated")
+        build("data/nvidia_ai_gpu_chip_test.yaml", None, use_cache=True)
+        assert len(built_models) == 5
+    finally:
+        if os.path.exists(cache_path):
+            os.remove(cache_path)